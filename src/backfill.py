@@ -0,0 +1,127 @@
+"""
+Offline backfill of catalog directories. Parses files in parallel, groups them without going through the API and
+checkpoints the state, so an interrupted run resumes where it stopped. The resulting state file can be loaded by the
+API server at startup (STATE_PATH).
+
+Usage:
+    python -m src.backfill <directory> --state dump/state.json [--llm-budget N] [--workers N] [--checkpoint-every N] [--consolidate]
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+from time import time
+
+from src.config import logger, BACKFILL_PARSE_WORKERS, BACKFILL_CHECKPOINT_EVERY, CONSOLIDATION_LLM_BUDGET
+from src.domain import Item
+from src.llm import LLM, LLMBudgetExceededError
+from src.service import CSVItemCreatorService, PDFItemCreatorService, GroupingService, GroupConsolidationService
+from src import app_state
+
+SUPPORTED_SUFFIXES = (".csv", ".pdf")
+
+async def parse_file(file_path: Path) -> list[Item]:
+    """Creates items from a catalog file according to its type."""
+
+    if file_path.suffix.lower() == ".csv":
+        return await CSVItemCreatorService.process_csv_file(file_path)
+    return await PDFItemCreatorService.process_pdf_file(file_path)
+
+async def backfill(directory: Path, state_path: Path, llm_budget: int | None = None, workers: int = BACKFILL_PARSE_WORKERS,
+                   checkpoint_every: int = BACKFILL_CHECKPOINT_EVERY, consolidate: bool = False) -> None:
+    """
+    Processes every CSV/PDF file under `directory`. Files already in the state (same content hash) are skipped,
+    which is what makes an interrupted run resumable, and files with the same content are processed once.
+
+    Args:
+        directory (Path): Directory scanned recursively for catalogs.
+        state_path (Path): State file, loaded if it exists and saved at every checkpoint.
+        llm_budget (int | None): Maximum number of LLM calls for the run (None for unlimited). The run stops at the
+            first file needing a call past the budget; that file is rolled back and, like the remaining files, left
+            for a later run.
+        workers (int): Number of files parsed concurrently.
+        checkpoint_every (int): Number of grouped files between checkpoints.
+        consolidate (bool): Run a group consolidation pass at the end, with the remaining LLM budget.
+    """
+
+    if state_path.exists():
+        await app_state.load(state_path)
+        logger.info(f"Resuming from {state_path}: {len(app_state.groups)} groups, {len(app_state.content_hashes)} files already processed.")
+
+    LLM.set_budget(llm_budget)
+
+    pending = list()
+    pending_hashes = set()
+    for file_path in sorted(p for p in directory.rglob("*") if p.suffix.lower() in SUPPORTED_SUFFIXES):
+        content_hash = app_state.hash_content(file_path.read_bytes())
+        if content_hash in pending_hashes: # Copies of a same catalog are ingested once, like uploads
+            logger.info(f"Skipping {file_path}: same content as another file of the run.")
+        elif content_hash not in app_state.content_hashes:
+            pending.append((file_path, content_hash))
+            pending_hashes.add(content_hash)
+    logger.info(f"{len(pending)} files to process in {directory}.")
+
+    time_start = time()
+    grouped_files = 0
+    since_checkpoint = 0
+    stopped = False
+    for start in range(0, len(pending), workers):
+        chunk = pending[start:start+workers]
+        parsed = await asyncio.gather(*(parse_file(file_path) for file_path, _ in chunk), return_exceptions=True)
+
+        for (file_path, content_hash), items in zip(chunk, parsed):
+            if isinstance(items, LLMBudgetExceededError): # Files parsed without the LLM are still grouped
+                logger.warning(f"LLM budget of {llm_budget} calls exhausted while parsing {file_path}. Stopping.")
+                stopped = True
+                break
+            if isinstance(items, Exception): # Left unmarked, so the next run tries again
+                logger.error(f"Failed to parse {file_path}: {items}")
+                continue
+
+            if items: # Each file is one batch: items of a same catalog are never equivalent among themselves
+                first_new_group_id = app_state.next_group_id
+                try:
+                    await GroupingService.group_items(items)
+                except LLMBudgetExceededError: # Roll the file back so a later run groups it from scratch
+                    await app_state.ungroup_items(items, first_new_group_id)
+                    logger.warning(f"LLM budget of {llm_budget} calls exhausted while grouping {file_path}. File rolled back, stopping.")
+                    stopped = True
+                    break
+            await app_state.add_content_hash(content_hash)
+            app_state.total_processed_files += 1
+            grouped_files += 1
+            since_checkpoint += 1
+
+            if since_checkpoint >= checkpoint_every:
+                await app_state.save(state_path)
+                since_checkpoint = 0
+                logger.info(f"Checkpoint: {grouped_files}/{len(pending)} files, {len(app_state.groups)} groups.")
+
+        if stopped:
+            break
+
+    if consolidate: # Even without budget left, confident pairs are merged without the LLM
+        remaining_budget = CONSOLIDATION_LLM_BUDGET if llm_budget is None else max(llm_budget - LLM.call_count, 0)
+        await GroupConsolidationService.consolidate(llm_budget=remaining_budget)
+
+    await app_state.save(state_path)
+    await LLM.close()
+    logger.info(
+        f"Backfill {'stopped' if stopped else 'finished'}: {grouped_files}/{len(pending)} files in {time() - time_start:.2f} seconds. "
+        f"Groups: {len(app_state.groups)}. LLM usage: {LLM.call_count}{f'/{llm_budget}' if llm_budget is not None else ''}. State saved to {state_path}."
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill a directory of CSV/PDF catalogs into a state file the API can load.")
+    parser.add_argument("directory", type=Path, help="Directory scanned recursively for CSV/PDF catalogs.")
+    parser.add_argument("--state", type=Path, default=Path("dump/state.json"), help="State file to resume from and write to.")
+    parser.add_argument("--llm-budget", type=int, default=None, help="Maximum number of LLM calls (default: unlimited).")
+    parser.add_argument("--workers", type=int, default=BACKFILL_PARSE_WORKERS, help="Files parsed concurrently.")
+    parser.add_argument("--checkpoint-every", type=int, default=BACKFILL_CHECKPOINT_EVERY, help="Files grouped between checkpoints.")
+    parser.add_argument("--consolidate", action="store_true", help="Merge split groups at the end of the run.")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.directory, args.state, args.llm_budget, args.workers, args.checkpoint_every, args.consolidate))
+
+if __name__ == "__main__":
+    main()
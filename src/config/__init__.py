@@ -1,5 +1,14 @@
 from .prompts import SELECTING_USEFUL_COLS_PROMPT, SELECTING_SIMILAR_ITEM_PROMPT
-from .settings import OPENAI_API_KEY, LLM_MODEL_NAME, SIMILARITY_THRESHOLD, SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT, JACCARD_WEIGHT, LEVENSHTEIN_WEIGHT, LOGGER_LEVEL
+from .settings import (
+    OPENAI_API_KEY, LLM_MODEL_NAME, LLM_BASE_URL, STATE_PATH,
+    LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_REQUEST_TIMEOUT, LLM_CALL_DEADLINE,
+    LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_HEDGE_DELAY,
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_ESTIMATED_OUTPUT_TOKENS, LLM_INVALID_ANSWER_RETRIES,
+    SIMILARITY_THRESHOLD, SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT, KEY_WORDS_MIN_MATCH_RATIO,
+    INFERRED_KEY_WORDS_TOP_K, INFERRED_KEY_WORDS_MIN_TF, INFERRED_KEY_WORDS_REFRESH_RATIO,
+    CONSOLIDATION_MIN_SHARED_KEYS, CONSOLIDATION_MAX_BLOCK_SIZE, CONSOLIDATION_AMBIGUITY_MARGIN, CONSOLIDATION_LLM_BUDGET, CONSOLIDATION_LLM_CONCURRENCY,
+    EXPORT_PARQUET_BATCH_SIZE, BACKFILL_PARSE_WORKERS, BACKFILL_CHECKPOINT_EVERY, JACCARD_WEIGHT, LEVENSHTEIN_WEIGHT, LOGGER_LEVEL
+)
 from .logging import logger
 
 __all__ = [
@@ -7,10 +16,36 @@ __all__ = [
     "SELECTING_SIMILAR_ITEM_PROMPT",
     "OPENAI_API_KEY",
     "LLM_MODEL_NAME",
+    "LLM_BASE_URL",
+    "STATE_PATH",
+    "LLM_MAX_CONNECTIONS",
+    "LLM_MAX_KEEPALIVE_CONNECTIONS",
+    "LLM_REQUEST_TIMEOUT",
+    "LLM_CALL_DEADLINE",
+    "LLM_MAX_RETRIES",
+    "LLM_RETRY_BASE_DELAY",
+    "LLM_RETRY_MAX_DELAY",
+    "LLM_HEDGE_DELAY",
+    "LLM_REQUESTS_PER_MINUTE",
+    "LLM_TOKENS_PER_MINUTE",
+    "LLM_ESTIMATED_OUTPUT_TOKENS",
+    "LLM_INVALID_ANSWER_RETRIES",
     "SIMILARITY_THRESHOLD",
     "SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT",
+    "KEY_WORDS_MIN_MATCH_RATIO",
+    "INFERRED_KEY_WORDS_TOP_K",
+    "INFERRED_KEY_WORDS_MIN_TF",
+    "INFERRED_KEY_WORDS_REFRESH_RATIO",
+    "CONSOLIDATION_MIN_SHARED_KEYS",
+    "CONSOLIDATION_MAX_BLOCK_SIZE",
+    "CONSOLIDATION_AMBIGUITY_MARGIN",
+    "CONSOLIDATION_LLM_BUDGET",
+    "CONSOLIDATION_LLM_CONCURRENCY",
+    "EXPORT_PARQUET_BATCH_SIZE",
+    "BACKFILL_PARSE_WORKERS",
+    "BACKFILL_CHECKPOINT_EVERY",
     "JACCARD_WEIGHT",
     "LEVENSHTEIN_WEIGHT",
     "LOGGER_LEVEL",
     "logger"
-]
\ No newline at end of file
+]
@@ -4,11 +4,46 @@ from dotenv import load_dotenv; load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gpt-5-nano-2025-08-07")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") # Optional, e.g. a local fake server for tests
+STATE_PATH = os.getenv("STATE_PATH") # Optional, state file loaded at startup and saved at shutdown
+
+# LLM gateway
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE_CONNECTIONS = 10
+LLM_REQUEST_TIMEOUT = 30.0 # seconds, per HTTP attempt
+LLM_CALL_DEADLINE = 90.0 # seconds, for a whole call including retries
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BASE_DELAY = 0.5 # seconds
+LLM_RETRY_MAX_DELAY = 8.0 # seconds
+LLM_HEDGE_DELAY = None # seconds before firing a duplicate request (None disables hedging)
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 200_000
+LLM_ESTIMATED_OUTPUT_TOKENS = 256 # reserved per call before the real usage is known
+LLM_INVALID_ANSWER_RETRIES = 1 # extra attempts when the answer is not one of the possible values
 
 SIMILARITY_THRESHOLD = 0.35
 JACCARD_WEIGHT = 1.30
 LEVENSHTEIN_WEIGHT = 0.70
 
 SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT = 5
+KEY_WORDS_MIN_MATCH_RATIO = 0.8 # fraction of a group's key words an item must contain
+
+# Inferred key words (TF-IDF, each group being a document)
+INFERRED_KEY_WORDS_TOP_K = 3 # key words inferred per group
+INFERRED_KEY_WORDS_MIN_TF = 0.8 # fraction of the group's items a term must appear in to be eligible
+INFERRED_KEY_WORDS_REFRESH_RATIO = 0.1 # recompute when the number of groups changed by more than this fraction
+
+# Group consolidation
+CONSOLIDATION_MIN_SHARED_KEYS = 2 # blocking keys two groups must share to be compared
+CONSOLIDATION_MAX_BLOCK_SIZE = 200 # blocking keys shared by more groups than this are too common to be useful
+CONSOLIDATION_AMBIGUITY_MARGIN = 0.10 # pairs scoring below SIMILARITY_THRESHOLD + margin are sent to the LLM
+CONSOLIDATION_LLM_BUDGET = 50 # maximum LLM calls per consolidation pass
+CONSOLIDATION_LLM_CONCURRENCY = 5 # ambiguous pairs sent to the LLM at the same time
+
+EXPORT_PARQUET_BATCH_SIZE = 10_000 # items per Parquet row group
+
+# Offline backfill
+BACKFILL_PARSE_WORKERS = 8 # files parsed concurrently
+BACKFILL_CHECKPOINT_EVERY = 10 # files grouped between checkpoints
 
-LOGGER_LEVEL = DEBUG
\ No newline at end of file
+LOGGER_LEVEL = DEBUG
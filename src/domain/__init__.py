@@ -1,7 +1,9 @@
 from .item import Item
 from .group import Group
+from .term_statistics import TermStatistics
 
 __all__ = [
     "Item",
-    "Group"
+    "Group",
+    "TermStatistics"
 ]
\ No newline at end of file
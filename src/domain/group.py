@@ -1,6 +1,9 @@
 from asyncio import Lock
+from collections import Counter
 
+from src.config import INFERRED_KEY_WORDS_TOP_K, INFERRED_KEY_WORDS_MIN_TF, INFERRED_KEY_WORDS_REFRESH_RATIO
 from . import Item
+from .term_statistics import TermStatistics
 
 class Group:
     """
@@ -8,42 +11,54 @@ class Group:
     Attributes:
         group_id (int): Unique identifier for the group.
         items (dict[str, Item]): Dictionary of items in the group, keyed by their system_id.
-        key_words (set[str]): Set of key words associated with the group.
+        key_words (set[str]): Set of key words associated with the group (curated by humans).
+        term_counts (Counter[str]): Number of items of the group containing each stemmed term.
+        corpus (TermStatistics): Term statistics of all the groups of the state this group belongs to.
         lock (Lock): Asynchronous lock for thread-safe operations on the group.
     """
 
-    def __init__(self, group_id: int):
+    def __init__(self, group_id: int, corpus: TermStatistics):
         self.group_id = group_id
         self.items: dict[str, Item] = dict()
         self.key_words: set[str] = set()
+        self.term_counts: Counter[str] = Counter()
+        self.corpus = corpus
         self.lock = Lock()
-    
+
+        # Lazily refreshed inferred key words
+        self._inferred_key_words: set[str] = set()
+        self._inferred_stale = True
+        self._inferred_corpus_documents = 0
+
     async def add_item(self, item: Item):
         """Adds an item to the group."""
 
         async with self.lock:
+            if item.system_id not in self.items:
+                self._count_terms(item, 1)
             self.items[item.system_id] = item
             item.group_id = self.group_id
-    
+
     async def remove_item(self, item_id: str) -> Item | None:
         """Removes an item from the group by its ID. Returns the removed item, or None if not found."""
-        
+
         async with self.lock:
             item = self.items.pop(item_id, None)
             if item:
                 item.group_id = None
+                self._count_terms(item, -1)
             return item
-    
+
     async def get_item_by_id(self, system_item_id: str) -> Item | None:
         """Returns the item with the given system ID if it exists in the group."""
-        
+
         async with self.lock:
             item = self.items.get(system_item_id)
             return item
 
     async def add_key_words(self, key_words: list[str]):
         """Adds key words to the group. Both original and stemmed versions are stored."""
-        
+
         key_words = [kw.strip().lower() for kw in key_words if kw.strip()]
         stemmed_key_words = {Item.stemmer.stem(kw) for kw in key_words}
 
@@ -51,4 +66,57 @@ class Group:
             for kw in key_words:
                 self.key_words.add(kw)
             for skw in stemmed_key_words:
-                self.key_words.add(skw)
\ No newline at end of file
+                self.key_words.add(skw)
+
+    def inferred_key_words(self) -> set[str]:
+        """
+        Returns the stemmed terms that best distinguish this group from the others (TF-IDF, each group being a document).
+        Only terms present in most items of the group are eligible. Ties are broken by the position of the term in the
+        representative (first) item, since descriptions usually start with what the product is. The result is cached and
+        recomputed when the group changes or when the number of groups changed significantly since the last computation.
+        """
+
+        documents = self.corpus.documents
+        corpus_drift = abs(documents - self._inferred_corpus_documents) > INFERRED_KEY_WORDS_REFRESH_RATIO * max(self._inferred_corpus_documents, 1)
+        if self._inferred_stale or corpus_drift:
+            self._inferred_key_words = self._compute_inferred_key_words()
+            self._inferred_stale = False
+            self._inferred_corpus_documents = documents
+
+        return self._inferred_key_words
+
+    def _compute_inferred_key_words(self) -> set[str]:
+        size = len(self.items)
+        if size == 0:
+            return set()
+
+        representative_words = [Item.stemmer.stem(word) for word in next(iter(self.items.values())).original_description.split()]
+        positions = {term: position for position, term in reversed(list(enumerate(representative_words)))}
+
+        scores = list()
+        for term, count in self.term_counts.items():
+            tf = count / size
+            if tf >= INFERRED_KEY_WORDS_MIN_TF:
+                scores.append((-tf * self.corpus.idf(term), positions.get(term, len(representative_words)), term))
+
+        scores.sort()
+        return {term for _, _, term in scores[:INFERRED_KEY_WORDS_TOP_K]}
+
+    def _count_terms(self, item: Item, delta: int):
+        """Updates group term counts and corpus document frequencies when an item enters (+1) or leaves (-1) the group."""
+
+        if delta > 0 and not self.items:
+            self.corpus.documents += 1
+
+        for term in item.words_set:
+            self.term_counts[term] += delta
+            if delta > 0 and self.term_counts[term] == 1: # First item of the group with this term
+                self.corpus.add_term(term)
+            elif delta < 0 and self.term_counts[term] == 0: # Last item of the group with this term
+                del self.term_counts[term]
+                self.corpus.remove_term(term)
+
+        if delta < 0 and not self.items:
+            self.corpus.documents -= 1
+
+        self._inferred_stale = True
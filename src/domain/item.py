@@ -36,6 +36,14 @@ class Item:
         self.unified_description = "".join(stemmed_description)
         self.group_id = None
     
+    @classmethod
+    def restore(cls, system_id: str, original_id: str, origin_file: str, original_description: str) -> "Item":
+        """Rebuilds a persisted item, keeping its system ID. The description is already normalized, so stems are the same."""
+
+        item = cls(descriptive_cols_data=[original_description], origin_file=origin_file, item_id=original_id)
+        item.system_id = system_id
+        return item
+
     def compare_with_items(self, other_items: list["Item"]) -> list[float]:
         """
         Calculates the average similarity score with the given group of items by sampling
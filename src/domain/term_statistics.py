@@ -0,0 +1,27 @@
+from collections import Counter
+from math import log
+
+class TermStatistics:
+    """
+    Corpus-level term statistics used to infer group key words with TF-IDF. Each non-empty group is a document.
+    Owned by the app state, shared by its groups and kept up to date incrementally by `Group.add_item` and `Group.remove_item`.
+    Attributes:
+        document_frequencies (Counter[str]): Number of groups containing each stemmed term.
+        documents (int): Number of non-empty groups.
+    """
+
+    def __init__(self):
+        self.document_frequencies: Counter[str] = Counter()
+        self.documents = 0
+
+    def add_term(self, term: str):
+        self.document_frequencies[term] += 1
+
+    def remove_term(self, term: str):
+        self.document_frequencies[term] -= 1
+        if self.document_frequencies[term] <= 0:
+            del self.document_frequencies[term]
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency."""
+        return log((1 + self.documents) / (1 + self.document_frequencies[term])) + 1.0
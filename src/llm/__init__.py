@@ -1,3 +1,3 @@
-from .llm import LLM
+from .llm import LLM, LLMBudgetExceededError
 
-__all__ = ["LLM"]
\ No newline at end of file
+__all__ = ["LLM", "LLMBudgetExceededError"]
\ No newline at end of file
@@ -1,17 +1,202 @@
+import asyncio
+import random
+import re
+
+import httpx
+import openai
 from openai import AsyncOpenAI
 
-from src.config import OPENAI_API_KEY, LLM_MODEL_NAME
+from src.config import (
+    logger, OPENAI_API_KEY, LLM_MODEL_NAME, LLM_BASE_URL,
+    LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_REQUEST_TIMEOUT, LLM_CALL_DEADLINE,
+    LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_HEDGE_DELAY,
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_ESTIMATED_OUTPUT_TOKENS, LLM_INVALID_ANSWER_RETRIES
+)
+from .rate_limiter import RateLimiter
+
+class LLMBudgetExceededError(Exception):
+    """Raised when the LLM call budget set with `LLM.set_budget` is exhausted."""
+
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError, TimeoutError)
+
+_UNSET = object() # Marks arguments not passed to `LLM.configure`, since None is a meaningful value
+
+def _build_client(api_key: str | None, base_url: str | None, transport: httpx.AsyncBaseTransport | None = None) -> AsyncOpenAI:
+    """Builds an OpenAI client backed by a pooled HTTP client. Retries are handled by the gateway, not by the SDK."""
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS),
+        timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT),
+        transport=transport
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
 
 class LLM:
+    """
+    Gateway to the language model. All calls share a pooled client, go through a requests/tokens per minute
+    limiter, are bounded by a deadline and retried with jittered exponential backoff. Optionally, a duplicate
+    (hedged) request is fired when the first one is slow, and the first answer to arrive is used.
+    """
+
     api_key = OPENAI_API_KEY
     model_name = LLM_MODEL_NAME
-    client = AsyncOpenAI(api_key=api_key)
-    
+    base_url = LLM_BASE_URL
+    client = _build_client(api_key, base_url)
+    requests_per_minute = LLM_REQUESTS_PER_MINUTE
+    tokens_per_minute = LLM_TOKENS_PER_MINUTE
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    hedge_delay = LLM_HEDGE_DELAY
+    call_budget: int | None = None # None means unlimited
+    call_count = 0
+
     @classmethod
-    async def execute(cls, input_query: str) -> str:
+    async def configure(cls, api_key: str | None = None, base_url: str | None = None, model_name: str | None = None,
+                        requests_per_minute: int | None = None, tokens_per_minute: int | None = None,
+                        hedge_delay: float | None = _UNSET, transport: httpx.AsyncBaseTransport | None = None):
+        """
+        Rebuilds the client and limiter, e.g. to point the gateway to a local fake server (`base_url`) or to a mocked
+        transport. Unset arguments are kept; `hedge_delay=None` disables hedging. The previous client is closed.
+        """
+
+        cls.api_key = api_key or cls.api_key
+        cls.base_url = base_url or cls.base_url
+        cls.model_name = model_name or cls.model_name
+        cls.requests_per_minute = requests_per_minute or cls.requests_per_minute
+        cls.tokens_per_minute = tokens_per_minute or cls.tokens_per_minute
+        cls.hedge_delay = cls.hedge_delay if hedge_delay is _UNSET else hedge_delay
+
+        old_client = cls.client
+        cls.client = _build_client(cls.api_key, cls.base_url, transport)
+        await old_client.close()
+        cls.rate_limiter = RateLimiter(cls.requests_per_minute, cls.tokens_per_minute)
+
+    @classmethod
+    def set_budget(cls, max_calls: int | None):
+        """Limits the number of calls from now on (None removes the limit). Retries and hedged requests of a call are not counted."""
+
+        cls.call_budget = max_calls
+        cls.call_count = 0
+
+    @classmethod
+    def budget_exhausted(cls) -> bool:
+        """Returns True if no more calls are allowed by the current budget."""
+        return cls.call_budget is not None and cls.call_count >= cls.call_budget
+
+    @classmethod
+    async def close(cls):
+        """Closes the pooled connections."""
+        await cls.client.close()
+
+    @classmethod
+    async def execute(cls, input_query: str, deadline: float = LLM_CALL_DEADLINE) -> str:
+        """
+        Sends the query to the model and returns its text answer.
+        Args:
+            input_query (str): The prompt.
+            deadline (float): Maximum time in seconds for the whole call, retries included.
+        Raises:
+            LLMBudgetExceededError: If the call budget is exhausted.
+            TimeoutError: If the deadline expires.
+            openai.APIError: If the provider keeps failing after all retries or returns a non-retryable error.
+        """
+
+        if cls.budget_exhausted():
+            raise LLMBudgetExceededError(f"LLM call budget of {cls.call_budget} calls exhausted.")
+        cls.call_count += 1
+
+        async with asyncio.timeout(deadline):
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                try:
+                    return await cls._hedged_request(input_query)
+                except RETRYABLE_ERRORS as e:
+                    if attempt == LLM_MAX_RETRIES:
+                        raise
+                    delay = cls._backoff_delay(attempt, e)
+                    logger.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.2f} seconds ({attempt + 1}/{LLM_MAX_RETRIES}).")
+                    await asyncio.sleep(delay)
+
+    @classmethod
+    async def execute_choice(cls, input_query: str, possible_values: list[int], deadline: float = LLM_CALL_DEADLINE) -> int | None:
+        """
+        Sends the query and parses the answer as an integer that must be one of `possible_values`.
+        The model is asked again if the answer is invalid. Returns None if no valid answer was obtained.
+        """
+
+        for _ in range(LLM_INVALID_ANSWER_RETRIES + 1):
+            choice = cls.parse_choice(await cls.execute(input_query, deadline), possible_values)
+            if choice is not None:
+                return choice
+
+        return None
+
+    @staticmethod
+    def parse_choice(response: str, possible_values: list[int]) -> int | None:
+        """Parses an answer that must be exactly one of `possible_values`. Returns None (and logs) otherwise."""
+
+        answer = response.strip()
+        if re.fullmatch(r"-?\d+", answer) and int(answer) in possible_values:
+            return int(answer)
+        logger.warning(f"Invalid LLM answer '{answer[:50]}'. Expected one of: {possible_values}.")
+        return None
+
+    @classmethod
+    async def _hedged_request(cls, input_query: str) -> str:
+        """Runs the request and, if it is slower than `hedge_delay`, a duplicate. Returns the first successful answer."""
+
+        if cls.hedge_delay is None:
+            return await cls._request(input_query)
+
+        primary = asyncio.create_task(cls._request(input_query))
+        pending = {primary}
+        error = None
+        try: # Unfinished requests are cancelled on every exit, including a deadline cancelling this call
+            done, pending = await asyncio.wait(pending, timeout=cls.hedge_delay)
+            if done:
+                return primary.result()
+
+            logger.debug(f"LLM call slower than {cls.hedge_delay:.2f} seconds, sending hedged request.")
+            pending.add(asyncio.create_task(cls._request(input_query)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                errors = [task.exception() for task in done] # Retrieved for every finished task, so none is left unobserved
+                for task, task_error in zip(done, errors):
+                    if task_error is None:
+                        return task.result()
+                    error = task_error
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @classmethod
+    async def _request(cls, input_query: str) -> str:
+        """Single rate limited request to the provider."""
+
+        estimated_tokens = len(input_query) // 4 + LLM_ESTIMATED_OUTPUT_TOKENS # ~4 characters per token
+        await cls.rate_limiter.acquire(estimated_tokens)
+
         response = await cls.client.responses.create(
             model=cls.model_name,
             input=input_query,
             reasoning={"effort": "low"}
         )
-        return response.output_text
\ No newline at end of file
+
+        used_tokens = response.usage.total_tokens if response.usage else None
+        cls.rate_limiter.reconcile(estimated_tokens, used_tokens)
+        return response.output_text
+
+    @staticmethod
+    def _backoff_delay(attempt: int, error: Exception) -> float:
+        """Full jitter exponential backoff. Honors the provider's Retry-After header when present."""
+
+        delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+        return delay
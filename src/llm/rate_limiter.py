@@ -0,0 +1,61 @@
+import asyncio
+from time import monotonic
+
+class TokenBucket:
+    """
+    Asynchronous token bucket. Holds up to `capacity` tokens, refilled continuously at `refill_rate` tokens per second.
+    Attributes:
+        capacity (float): Maximum number of tokens the bucket can hold.
+        refill_rate (float): Tokens added per second.
+        tokens (float): Tokens currently available (may go negative after a reconciliation).
+        lock (Lock): Asynchronous lock serializing acquisitions so waiters are served in order.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Waits until `amount` tokens are available and takes them. Requests larger than the capacity are clamped."""
+
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.refill_rate)
+                self._refill()
+            self.tokens -= amount
+
+    def consume(self, amount: float):
+        """Takes `amount` tokens without waiting, used to reconcile an estimate with the real usage."""
+
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+class RateLimiter:
+    """Limits both requests per minute and tokens per minute sent to the LLM provider."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    async def acquire(self, estimated_tokens: int):
+        """Waits for one request slot and for `estimated_tokens` tokens."""
+
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+    def reconcile(self, estimated_tokens: int, used_tokens: int | None):
+        """Adjusts the token bucket once the provider reports how many tokens the call actually used."""
+
+        if used_tokens is None:
+            return
+        self.tokens.consume(used_tokens - estimated_tokens)
@@ -1,11 +1,14 @@
 from fastapi import FastAPI, UploadFile, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
+from importlib.util import find_spec
 from datetime import datetime
 import os
 from pathlib import Path
 
-from src.config import logger
-from src.service import CSVItemCreatorService, PDFItemCreatorService, GroupingService, GetSuspiciousItemsService
+from src.config import logger, CONSOLIDATION_LLM_BUDGET, STATE_PATH
+from src.llm import LLM
+from src.service import CSVItemCreatorService, PDFItemCreatorService, GroupingService, GetSuspiciousItemsService, ExportGroupsService, GroupConsolidationService
 from . import app_state
 
 storage_path = Path("ingested_files"); os.makedirs(storage_path, exist_ok=True)
@@ -33,7 +36,7 @@ async def save_file(uploaded_file: UploadFile) -> Path | None:
     Save uploaded file if its content is new (not a duplicate). Return file path if saved, else None.
     """
     content = await uploaded_file.read()
-    content_hash = hash(content)
+    content_hash = app_state.hash_content(content)
 
     added = await app_state.add_content_hash(content_hash)
     if not added:
@@ -47,11 +50,16 @@ async def save_file(uploaded_file: UploadFile) -> Path | None:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    pass
+    if STATE_PATH and os.path.exists(STATE_PATH): # e.g. a state produced by the offline backfill
+        await app_state.load(STATE_PATH)
+        logger.info(f"Loaded {len(app_state.groups)} groups from {STATE_PATH}.")
 
     yield
 
     await app_state.dump("dump")
+    if STATE_PATH:
+        await app_state.save(STATE_PATH)
+    await LLM.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -95,6 +103,26 @@ async def change_item_group(item_id: str, new_group_idx: int, key_words: list[st
     
     return {"info": f"Item with system ID '{item_id}' moved to group {new_group_idx} successfully.", "suspicious_items": suspicious_items}
 
+@app.post("/consolidategroups/")
+async def consolidate_groups(background_tasks: BackgroundTasks, llm_budget: int = CONSOLIDATION_LLM_BUDGET):
+    """
+    Start a background pass that merges equivalent groups. The result can be read from GET /consolidategroups/.
+
+    Args:
+        llm_budget (int, optional): Maximum number of LLM calls for ambiguous group pairs.
+    """
+
+    if app_state.consolidation_lock.locked():
+        return {"info": "A consolidation pass is already running."}
+
+    background_tasks.add_task(GroupConsolidationService.consolidate, llm_budget)
+    return {"info": "Consolidation pass started."}
+
+@app.get("/consolidategroups/")
+async def get_consolidation_report():
+    """Get the report of the last consolidation pass."""
+    return {"merges": app_state.last_consolidation_report}
+
 @app.get("/groups/")
 async def get_groups(limit: int = 10, offset: int = 0, itens_per_group: int = 3):
     """Get paginated groups for inspection"""
@@ -123,3 +151,30 @@ async def get_groups(limit: int = 10, offset: int = 0, itens_per_group: int = 3)
             "groups": result
         }
 
+@app.get("/export/")
+async def export_groups(format: str = "ndjson", min_group_id: int | None = None, max_group_id: int | None = None, origin_file: str | None = None):
+    """
+    Stream groups and their items (one record per item) from a consistent snapshot.
+
+    Args:
+        format (str): "ndjson" or "parquet".
+        min_group_id (int, optional): Smallest group ID to export (inclusive).
+        max_group_id (int, optional): Largest group ID to export (inclusive).
+        origin_file (str, optional): Export only items ingested from this file.
+    """
+
+    if format == "ndjson":
+        media_type, extension = "application/x-ndjson", "ndjson"
+    elif format == "parquet":
+        if find_spec("pyarrow") is None:
+            return {"info": "Parquet export requires 'pyarrow' to be installed."}
+        media_type, extension = "application/vnd.apache.parquet", "parquet"
+    else:
+        return {"info": f"Unsupported export format '{format}'. Use 'ndjson' or 'parquet'."}
+
+    snapshot = await ExportGroupsService.snapshot(min_group_id, max_group_id, origin_file)
+    return StreamingResponse(
+        ExportGroupsService.iter_export(snapshot, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=groups.{extension}"}
+    )
@@ -2,10 +2,14 @@ from .group_items import GroupingService
 from .create_items_from_csv import CSVItemCreatorService
 from .create_items_from_pdf import PDFItemCreatorService
 from .get_suspicious_items import GetSuspiciousItemsService
+from .export_groups import ExportGroupsService
+from .consolidate_groups import GroupConsolidationService
 
 __all__ = [
     "GroupingService",
     "CSVItemCreatorService",
     "PDFItemCreatorService",
-    "GetSuspiciousItemsService"
+    "GetSuspiciousItemsService",
+    "ExportGroupsService",
+    "GroupConsolidationService"
 ]
\ No newline at end of file
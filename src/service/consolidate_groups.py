@@ -0,0 +1,224 @@
+import asyncio
+from collections import defaultdict
+from time import time
+
+from src.config import (
+    logger, SELECTING_SIMILAR_ITEM_PROMPT, SIMILARITY_THRESHOLD, KEY_WORDS_MIN_MATCH_RATIO,
+    CONSOLIDATION_MIN_SHARED_KEYS, CONSOLIDATION_MAX_BLOCK_SIZE, CONSOLIDATION_AMBIGUITY_MARGIN, CONSOLIDATION_LLM_BUDGET,
+    CONSOLIDATION_LLM_CONCURRENCY, LLM_INVALID_ANSWER_RETRIES
+)
+from src.domain import Item, Group
+from src.llm import LLM
+from src import app_state
+
+class GroupConsolidationService:
+    """
+    Merges groups that represent the same product but were split because items are grouped one at a time
+    (e.g. every item of the first catalog seeds its own group). Candidate pairs come from blocking keys,
+    so only groups sharing enough words are compared.
+    """
+
+    @staticmethod
+    async def consolidate(llm_budget: int = CONSOLIDATION_LLM_BUDGET) -> list[dict]:
+        """
+        Runs a consolidation pass and returns a report with one entry per surviving group that absorbed others.
+        Only one pass runs at a time. Grouping goes on while pairs are scored and sent to the LLM, and only waits while
+        merges are applied: they move the snapshot's items only and are re-validated against the current groups.
+        The report is also kept in the app state.
+
+        Args:
+            llm_budget (int): Maximum number of LLM calls for ambiguous pairs.
+        """
+
+        async with app_state.consolidation_lock:
+            time_start = time()
+            snapshot = dict(await app_state.snapshot_groups())
+            key_words = {group_idx: set(app_state.groups[group_idx].key_words) for group_idx in snapshot if group_idx in app_state.groups}
+
+            candidate_pairs = GroupConsolidationService._find_candidate_pairs(snapshot)
+            scored_pairs = await asyncio.to_thread(GroupConsolidationService._score_pairs, snapshot, key_words, candidate_pairs)
+
+            ambiguity_limit = SIMILARITY_THRESHOLD + CONSOLIDATION_AMBIGUITY_MARGIN
+            confident_pairs = [(a, b, score) for a, b, score in scored_pairs if score < SIMILARITY_THRESHOLD]
+            ambiguous_pairs = [(a, b, score) for a, b, score in scored_pairs if SIMILARITY_THRESHOLD <= score < ambiguity_limit]
+
+            llm_pairs, llm_calls = await GroupConsolidationService._resolve_ambiguous_pairs(snapshot, ambiguous_pairs, llm_budget)
+
+            merges = GroupConsolidationService._plan_merges(snapshot, key_words, confident_pairs, llm_pairs)
+
+            report = list()
+            async with app_state.grouping_lock: # Merges delete groups, so they are not applied in the middle of a batch
+                for target_group_id, source_group_ids in merges.items():
+                    source_item_ids = {source_group_id: {item.system_id for item in snapshot[source_group_id]} for source_group_id in source_group_ids}
+                    merged = await app_state.merge_groups(target_group_id, source_item_ids, GroupConsolidationService._can_merge)
+                    if not merged: # Every source changed since the snapshot
+                        continue
+
+                    cluster = {target_group_id, *merged}
+                    report.append({
+                        "group_id": target_group_id,
+                        "merged_group_ids": list(merged),
+                        "items_moved": sum(merged.values()),
+                        "llm_decided": any(a in cluster and b in cluster for a, b, _ in llm_pairs)
+                    })
+
+            app_state.last_consolidation_report = report
+            logger.info(
+                f"Consolidated {sum(len(entry['merged_group_ids']) for entry in report)} groups into {len(report)} in {time() - time_start:.2f} seconds. "
+                f"Candidate pairs: {len(candidate_pairs)}. LLM usage: {llm_calls}/{llm_budget}."
+            )
+            return report
+
+    @staticmethod
+    def _blocking_keys(items: list[Item]) -> set[str]:
+        """Stemmed words of the group's representative item, ignoring very short tokens."""
+        return {word for word in items[0].words_set if len(word) >= 3}
+
+    @staticmethod
+    def _find_candidate_pairs(snapshot: dict[int, list[Item]]) -> list[tuple[int, int]]:
+        """Returns group pairs sharing at least CONSOLIDATION_MIN_SHARED_KEYS blocking keys."""
+
+        index = defaultdict(list) # blocking key -> group IDs
+        for group_idx, items in snapshot.items():
+            if items:
+                for key in GroupConsolidationService._blocking_keys(items):
+                    index[key].append(group_idx)
+
+        shared_keys = defaultdict(int)
+        for group_ids in index.values():
+            if len(group_ids) > CONSOLIDATION_MAX_BLOCK_SIZE: # Too common to discriminate
+                continue
+            for i, a in enumerate(group_ids):
+                for b in group_ids[i+1:]:
+                    shared_keys[(a, b)] += 1
+
+        return [pair for pair, count in shared_keys.items() if count >= CONSOLIDATION_MIN_SHARED_KEYS]
+
+    @staticmethod
+    def _score_pairs(snapshot: dict[int, list[Item]], key_words: dict[int, set[str]], pairs: list[tuple[int, int]]) -> list[tuple[int, int, float]]:
+        """
+        Scores candidate pairs (symmetric average of group similarity) ordered ascending by score. Pairs that cannot
+        be merged are dropped: groups sharing an origin file (items of a same catalog are not equivalent) or whose
+        items do not satisfy the other group's key words.
+        """
+
+        scored_pairs = list()
+        for a, b in pairs:
+            items_a, items_b = snapshot[a], snapshot[b]
+
+            if {item.origin_file for item in items_a} & {item.origin_file for item in items_b}:
+                continue
+            if not GroupConsolidationService._key_words_match(key_words.get(a, set()), items_b) or \
+               not GroupConsolidationService._key_words_match(key_words.get(b, set()), items_a):
+                continue
+
+            score = (items_a[0].compare_with_items(items_b) + items_b[0].compare_with_items(items_a)) / 2.0
+            scored_pairs.append((a, b, score))
+
+        scored_pairs.sort(key=lambda x: x[2])
+        return scored_pairs
+
+    @staticmethod
+    def _key_words_match(key_words: set[str], items: list[Item]) -> bool:
+        """Checks that every item contains the minimum ratio of the key words (always True without key words)."""
+
+        if not key_words:
+            return True
+        return all(
+            sum(1 for kw in key_words if kw in item.original_description) / len(key_words) >= KEY_WORDS_MIN_MATCH_RATIO
+            for item in items
+        )
+
+    @staticmethod
+    def _can_merge(target_group: Group, source_group: Group, items: list[Item]) -> bool:
+        """Re-checks, against the current groups, that moving `items` from the source into the target is allowed."""
+
+        target_items = list(target_group.items.values())
+        if {item.origin_file for item in items} & {item.origin_file for item in target_items}:
+            return False
+        return GroupConsolidationService._key_words_match(target_group.key_words, items) and \
+               GroupConsolidationService._key_words_match(source_group.key_words, target_items)
+
+    @staticmethod
+    async def _resolve_ambiguous_pairs(snapshot: dict[int, list[Item]], pairs: list[tuple[int, int, float]], llm_budget: int) -> tuple[list[tuple[int, int, float]], int]:
+        """
+        Asks the LLM, best scores first, whether the representative items of ambiguous pairs are equivalent. Every call
+        (including re-asks after an invalid answer) counts towards `llm_budget`, and at most CONSOLIDATION_LLM_CONCURRENCY
+        pairs are in flight. Failures count as "no". Returns the accepted pairs and the number of calls made.
+        """
+
+        accepted = list()
+        calls = 0
+        pending_pairs = iter(pairs)
+
+        async def worker():
+            nonlocal calls
+            for a, b, score in pending_pairs:
+                if calls >= llm_budget:
+                    return
+
+                prompt = SELECTING_SIMILAR_ITEM_PROMPT.format(
+                    items=f"- número do item: {b}, descrição: {snapshot[b][0].original_description}",
+                    item=f"Descrição: {snapshot[a][0].original_description}",
+                    possible_values=f"{b}, -1"
+                ).strip()
+
+                for _ in range(LLM_INVALID_ANSWER_RETRIES + 1):
+                    if calls >= llm_budget:
+                        break
+                    calls += 1
+                    try:
+                        choice = LLM.parse_choice(await LLM.execute(prompt), [b, -1])
+                    except Exception as e:
+                        logger.error(f"LLM call failed while consolidating groups {a} and {b}: {e}")
+                        break
+                    if choice is not None:
+                        if choice == b:
+                            accepted.append((a, b, score))
+                        break
+
+        await asyncio.gather(*(worker() for _ in range(CONSOLIDATION_LLM_CONCURRENCY)))
+        return accepted, calls
+
+    @staticmethod
+    def _plan_merges(snapshot: dict[int, list[Item]], key_words: dict[int, set[str]], *pair_lists: list[tuple[int, int, float]]) -> dict[int, list[int]]:
+        """
+        Joins accepted pairs (best scores first) with a union-find. Two clusters are never joined if they share an
+        origin file or if the items of one do not satisfy the key words of the other, so constraints hold for whole
+        clusters and not only for the pairs. The largest group of each cluster survives.
+        Returns {surviving group ID: absorbed group IDs}.
+        """
+
+        parent = {group_idx: group_idx for group_idx in snapshot}
+        origin_files = {group_idx: {item.origin_file for item in items} for group_idx, items in snapshot.items()}
+        cluster_key_words = {group_idx: set(key_words.get(group_idx, set())) for group_idx in snapshot}
+        cluster_items = {group_idx: list(items) for group_idx, items in snapshot.items()}
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        pairs = sorted((pair for pair_list in pair_lists for pair in pair_list), key=lambda x: x[2])
+        for a, b, _ in pairs:
+            root_a, root_b = find(a), find(b)
+            if root_a == root_b or origin_files[root_a] & origin_files[root_b]:
+                continue
+            if not GroupConsolidationService._key_words_match(cluster_key_words[root_a], cluster_items[root_b]) or \
+               not GroupConsolidationService._key_words_match(cluster_key_words[root_b], cluster_items[root_a]):
+                continue
+            if (len(cluster_items[root_b]), -root_b) > (len(cluster_items[root_a]), -root_a):
+                root_a, root_b = root_b, root_a
+            parent[root_b] = root_a
+            origin_files[root_a] |= origin_files[root_b]
+            cluster_key_words[root_a] |= cluster_key_words[root_b]
+            cluster_items[root_a] += cluster_items[root_b]
+
+        clusters = defaultdict(list)
+        for group_idx in snapshot:
+            root = find(group_idx)
+            if root != group_idx:
+                clusters[root].append(group_idx)
+
+        return dict(clusters)
@@ -1,3 +1,4 @@
+import asyncio
 import pandas as pd
 from pathlib import Path
 
@@ -11,9 +12,9 @@ class CSVItemCreatorService:
 
     @staticmethod
     async def process_csv_file(file_path: Path) -> list[Item]:
-        df = pd.read_csv(file_path)
+        df = await asyncio.to_thread(pd.read_csv, file_path) # Parsing is blocking, keep it off the event loop
         cols = set(df.columns)
-        cols_hash = hash(frozenset(cols))
+        cols_hash = app_state.hash_columns(cols)
 
         useful_cols = await app_state.get_cached_columns(cols_hash)
         if useful_cols is None:
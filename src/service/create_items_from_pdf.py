@@ -1,3 +1,4 @@
+import asyncio
 import pandas as pd
 from pathlib import Path
 import pdfplumber
@@ -11,7 +12,7 @@ class PDFItemCreatorService:
     """Service to create items from a PDF file."""
 
     @staticmethod
-    async def process_pdf_file(file_path: Path) -> list[Item]:
+    def _extract_tables(file_path: Path) -> list[pd.DataFrame]:
         tables = list()
         with pdfplumber.open(file_path) as pdf:
             for page in pdf.pages:
@@ -19,6 +20,11 @@ class PDFItemCreatorService:
                     cols = table[0]
                     content = table[1:]
                     tables.append(pd.DataFrame(content, columns=cols))
+        return tables
+
+    @staticmethod
+    async def process_pdf_file(file_path: Path) -> list[Item]:
+        tables = await asyncio.to_thread(PDFItemCreatorService._extract_tables, file_path) # Parsing is blocking, keep it off the event loop
 
         if not tables:
             logger.warning(f"No tables found in PDF file: {file_path}")
@@ -26,7 +32,7 @@ class PDFItemCreatorService:
 
         df = pd.concat(tables, ignore_index=True)
         cols = set(df.columns)
-        cols_hash = hash(frozenset(cols))
+        cols_hash = app_state.hash_columns(cols)
 
         useful_cols = await app_state.get_cached_columns(cols_hash)
         if useful_cols is None:
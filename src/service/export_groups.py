@@ -0,0 +1,134 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Iterator
+
+from src.config import logger, EXPORT_PARQUET_BATCH_SIZE
+from src.domain import Item
+from src import app_state
+
+EXPORT_FORMATS = ("ndjson", "parquet")
+
+class _ChunkSink:
+    """Write-only file-like object that keeps written bytes until they are drained, while reporting the absolute position."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = list()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+class ExportGroupsService:
+    """Service to export groups and their items incrementally from a consistent snapshot of the app state."""
+
+    @staticmethod
+    async def snapshot(min_group_id: int | None = None, max_group_id: int | None = None, origin_file: str | None = None) -> list[tuple[int, list[Item]]]:
+        """
+        Takes a snapshot of the groups, optionally filtered by group ID range (inclusive) and by origin file.
+        Groups with no item left after filtering by origin file are dropped.
+        """
+
+        snapshot = await app_state.snapshot_groups(min_group_id, max_group_id)
+        if origin_file is not None:
+            snapshot = [(group_idx, [item for item in items if item.origin_file == origin_file]) for group_idx, items in snapshot]
+            snapshot = [(group_idx, items) for group_idx, items in snapshot if items]
+
+        return snapshot
+
+    @staticmethod
+    def iter_rows(snapshot: list[tuple[int, list[Item]]]) -> Iterator[dict[str, str | int]]:
+        """Yields one flat record per item."""
+
+        for group_idx, items in snapshot:
+            for item in items:
+                yield {
+                    "group_id": group_idx,
+                    "system_item_id": item.system_id,
+                    "original_item_id": item.original_id,
+                    "description": item.original_description,
+                    "origin_file": item.origin_file
+                }
+
+    @staticmethod
+    def iter_ndjson(snapshot: list[tuple[int, list[Item]]]) -> Iterator[bytes]:
+        """Yields the snapshot as NDJSON, one item per line."""
+
+        for row in ExportGroupsService.iter_rows(snapshot):
+            yield (json.dumps(row, ensure_ascii=False) + "\n").encode()
+
+    @staticmethod
+    def iter_parquet(snapshot: list[tuple[int, list[Item]]], batch_size: int = EXPORT_PARQUET_BATCH_SIZE) -> Iterator[bytes]:
+        """Yields the snapshot as a Parquet file, one row group per `batch_size` items. Requires `pyarrow`."""
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("group_id", pa.int64()),
+            ("system_item_id", pa.string()),
+            ("original_item_id", pa.string()),
+            ("description", pa.string()),
+            ("origin_file", pa.string())
+        ])
+
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            batch = list()
+            for row in ExportGroupsService.iter_rows(snapshot):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                    batch.clear()
+                    yield sink.drain()
+            if batch:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+
+        yield sink.drain()
+
+    @staticmethod
+    def iter_export(snapshot: list[tuple[int, list[Item]]], export_format: str) -> Iterator[bytes]:
+        """Yields the snapshot serialized in the given format ("ndjson" or "parquet")."""
+
+        if export_format == "ndjson":
+            return ExportGroupsService.iter_ndjson(snapshot)
+        if export_format == "parquet":
+            return ExportGroupsService.iter_parquet(snapshot)
+        raise ValueError(f"Unsupported export format: {export_format}. Expected one of: {', '.join(EXPORT_FORMATS)}.")
+
+    @staticmethod
+    async def export_to_file(file_path: Path, export_format: str, min_group_id: int | None = None, max_group_id: int | None = None, origin_file: str | None = None) -> int:
+        """
+        Exports groups to a file. Serialization runs in a worker thread so the event loop is not blocked.
+        Returns the number of exported groups.
+        """
+
+        snapshot = await ExportGroupsService.snapshot(min_group_id, max_group_id, origin_file)
+        chunks = ExportGroupsService.iter_export(snapshot, export_format)
+
+        def write():
+            with open(file_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+
+        await asyncio.to_thread(write)
+        logger.info(f"Exported {len(snapshot)} groups to {file_path} as {export_format}.")
+        return len(snapshot)
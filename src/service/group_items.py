@@ -1,8 +1,8 @@
 from time import time
 
-from src.config import logger, SELECTING_SIMILAR_ITEM_PROMPT, SIMILARITY_THRESHOLD, SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT
-from src.domain import Item
-from src.llm import LLM
+from src.config import logger, SELECTING_SIMILAR_ITEM_PROMPT, SIMILARITY_THRESHOLD, SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT, KEY_WORDS_MIN_MATCH_RATIO
+from src.domain import Item, Group
+from src.llm import LLM, LLMBudgetExceededError
 from src import app_state
 
 class GroupingService:
@@ -11,11 +11,19 @@ class GroupingService:
     @staticmethod
     async def group_items(items: list[Item]) -> None:
         """
-        Groups items based on similarity.
+        Groups items based on similarity. Batches are grouped one at a time and never while a consolidation applies
+        merges, since scores are computed once per batch and merges delete groups.
         Args:
             items (list[Item]): The list of items to be grouped.
+        Raises:
+            LLMBudgetExceededError: If the LLM call budget runs out. Items already grouped stay in their groups.
         """
 
+        async with app_state.grouping_lock:
+            await GroupingService._group_items(items)
+
+    @staticmethod
+    async def _group_items(items: list[Item]) -> None:
         similarity_threshold = SIMILARITY_THRESHOLD
 
         if len(app_state.groups) == 0: # First items, create groups directly
@@ -36,24 +44,40 @@ class GroupingService:
             ask_llm = True
             if len(similar_items) == 1: # Add to existing group
                 group_idx = similar_items[0][0]
-                group_key_words = app_state.groups[group_idx].key_words
 
-                count_key_words_in_item = sum(1 for kw in group_key_words if kw in item.original_description)
-                if len(group_key_words) == 0 or (count_key_words_in_item / len(group_key_words) >= 0.8): # In case of having key words, require at least 80% match (adjustable)
+                if GroupingService._matches_key_words(item, app_state.groups[group_idx]):
                     ask_llm = False
                     await app_state.add_to_group(group_idx, item)
 
+            elif len(similar_items) > 1: # Several similar groups: try to tell them apart by their distinctive terms
+                matching_groups = [
+                    idx for idx, _ in similar_items
+                    if GroupingService._matches_key_words(item, app_state.groups[idx]) and GroupingService._matches_inferred_key_words(item, app_state.groups[idx])
+                ]
+                if len(matching_groups) == 1:
+                    ask_llm = False
+                    await app_state.add_to_group(matching_groups[0], item)
+
             if ask_llm: # Use LLM to decide from candidates
                 num_similar = len(similar_items) if len(similar_items) < SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT else SIZE_CANDIDATES_GROUP_FOR_LLM_PROMPT
                 candidate_groups = item_scores[:num_similar+1] # Take top N similar groups
                 prompt = GroupingService._build_prompt(item, candidate_groups)
+                possible_values = [idx for idx, _ in candidate_groups] + [-1]
 
                 llm_time_start = time()
-                response = await LLM.execute(prompt)
+                try:
+                    selected_idx = await LLM.execute_choice(prompt, possible_values)
+                except LLMBudgetExceededError: # Not a failure of this item: let the caller decide what to do with the batch
+                    raise
+                except Exception as e:
+                    logger.error(f"LLM call failed for item {item.system_id}: {e}")
+                    selected_idx = None
                 llm_latency += time() - llm_time_start
                 llm_use_count += 1
 
-                selected_idx = int(response)
+                if selected_idx is None: # No valid answer, keep the item apart rather than guessing
+                    logger.warning(f"No valid LLM answer for item {item.system_id}. Creating a new group.")
+                    selected_idx = -1
 
                 if selected_idx != -1: # Add to existing group
                     await app_state.add_to_group(selected_idx, item)
@@ -63,6 +87,30 @@ class GroupingService:
         time_end = time()
         logger.info(f"Grouped {len(items)} items in {time_end - time_start:.2f} seconds. LLM latency: {llm_latency:.2f} seconds. LLM usage: {llm_use_count}/{len(items)}.")
 
+    @staticmethod
+    def _matches_key_words(item: Item, group: Group) -> bool:
+        """Checks the group's curated key words. In case of having key words, require a minimum match ratio."""
+
+        group_key_words = group.key_words
+        if len(group_key_words) == 0:
+            return True
+        count_key_words_in_item = sum(1 for kw in group_key_words if kw in item.original_description)
+        return count_key_words_in_item / len(group_key_words) >= KEY_WORDS_MIN_MATCH_RATIO
+
+    @staticmethod
+    def _matches_inferred_key_words(item: Item, group: Group) -> bool:
+        """
+        Checks the group's inferred (TF-IDF) key words, which are stemmed terms, against the item's stemmed words.
+        A group without inferred key words (e.g. a mixed group, where no term is common enough) never matches,
+        since there is no evidence for it.
+        """
+
+        inferred_key_words = group.inferred_key_words()
+        if len(inferred_key_words) == 0:
+            return False
+        count_key_words_in_item = len(inferred_key_words & item.words_set)
+        return count_key_words_in_item / len(inferred_key_words) >= KEY_WORDS_MIN_MATCH_RATIO
+
     @staticmethod
     async def _compute_scores(items: list[Item]) -> list[tuple[int, float]]:
         """
@@ -1,10 +1,12 @@
 from dataclasses import dataclass, field
+from typing import Callable
 import asyncio
 from pathlib import Path
 import os
 import json
+import hashlib
 
-from src.domain import Item, Group
+from src.domain import Item, Group, TermStatistics
 
 @dataclass
 class AppState:
@@ -12,19 +14,35 @@ class AppState:
 
     # Data stores
     groups: dict[int, Group] = field(default_factory=dict)
-    cols_hashed: dict[int, str] = field(default_factory=dict)
-    content_hashes: set[int] = field(default_factory=set)
+    cols_hashed: dict[str, str] = field(default_factory=dict)
+    content_hashes: set[str] = field(default_factory=set)
+    next_group_id: int = 0 # Never reused, so IDs of merged groups do not come back
+    merged_groups: dict[int, int] = field(default_factory=dict) # Merged-away group ID -> group that absorbed it
+    last_consolidation_report: list[dict] = field(default_factory=list)
+    term_statistics: TermStatistics = field(default_factory=TermStatistics) # Corpus of the groups, for inferred key words
     
     # Locks for async safety
     groups_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
     content_hashes_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
     cols_hashed_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    consolidation_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    grouping_lock: asyncio.Lock = field(default_factory=asyncio.Lock) # Held by grouping and by consolidation while it applies merges, which must not interleave
     
     # Statistics
     total_processed_files: int = 0
     total_items_processed: int = 0
     
-    async def add_content_hash(self, content_hash: int) -> bool:
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        """Stable hash of a file content (unlike hash(), it survives restarts, so it can be persisted)"""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def hash_columns(cols: set[str]) -> str:
+        """Stable, order independent hash of a set of column names"""
+        return hashlib.sha256("\x1f".join(sorted(str(col) for col in cols)).encode()).hexdigest()
+
+    async def add_content_hash(self, content_hash: str) -> bool:
         """Add content hash if not duplicate, returns True if added"""
         async with self.content_hashes_lock:
             if content_hash in self.content_hashes:
@@ -32,12 +50,12 @@ class AppState:
             self.content_hashes.add(content_hash)
             return True
     
-    async def get_cached_columns(self, cols_hash: int) -> str | None:
+    async def get_cached_columns(self, cols_hash: str) -> str | None:
         """Get cached useful columns for a column hash"""
         async with self.cols_hashed_lock:
             return self.cols_hashed.get(cols_hash)
     
-    async def set_cached_columns(self, cols_hash: int, useful_cols: str):
+    async def set_cached_columns(self, cols_hash: str, useful_cols: str):
         """Cache useful columns for a column hash"""
         async with self.cols_hashed_lock:
             self.cols_hashed[cols_hash] = useful_cols
@@ -47,8 +65,11 @@ class AppState:
 
         group = None
         async with self.groups_lock:
+            while group_id in self.merged_groups: # Follow merges instead of bringing a merged-away group back
+                group_id = self.merged_groups[group_id]
             if group_id not in self.groups: # Create group if not exists
-                self.groups[group_id] = Group(group_id)
+                self.groups[group_id] = Group(group_id, self.term_statistics)
+                self.next_group_id = max(self.next_group_id, group_id + 1)
             group = self.groups[group_id]
             self.total_items_processed += 1
         
@@ -88,8 +109,9 @@ class AppState:
             
             # Add to new group or create new group
             if new_group_idx == -1:
-                new_group_idx = max(self.groups.keys(), default=-1) + 1
-                self.groups[new_group_idx] = Group(new_group_idx)
+                new_group_idx = self.next_group_id
+                self.next_group_id += 1
+                self.groups[new_group_idx] = Group(new_group_idx, self.term_statistics)
             
             new_group = self.groups[new_group_idx]
             await new_group.add_item(item_to_move)
@@ -100,27 +122,172 @@ class AppState:
         """Create a new group with the item, returns new group ID"""
         new_group = None
         async with self.groups_lock:
-            new_group_id = max(self.groups.keys(), default=-1) + 1
-            new_group = Group(new_group_id)
+            new_group_id = self.next_group_id
+            self.next_group_id += 1
+            new_group = Group(new_group_id, self.term_statistics)
             self.groups[new_group_id] = new_group
             self.total_items_processed += 1
             
         await new_group.add_item(item)
         return new_group.group_id
     
+    async def ungroup_items(self, items: list[Item], first_new_group_id: int):
+        """
+        Undoes the grouping of `items`: removes them from their groups and deletes the groups created from
+        `first_new_group_id` on that were left empty. Used to roll back a partially grouped batch.
+        """
+
+        async with self.groups_lock:
+            for item in items:
+                group = self.groups.get(item.group_id) if item.group_id is not None else None
+                if group and await group.remove_item(item.system_id):
+                    self.total_items_processed -= 1
+
+            for group_id in [group_id for group_id, group in self.groups.items() if group_id >= first_new_group_id and not group.items]:
+                del self.groups[group_id]
+
+    async def merge_groups(self, target_group_id: int, source_item_ids: dict[int, set[str]],
+                           validate: Callable[[Group, Group, list[Item]], bool] | None = None) -> dict[int, int]:
+        """
+        Moves the given items (and the key words) of each source group into the target group. Only the listed items
+        are moved, so items that entered a source group after the merge was planned stay where they are. A source
+        group left empty is deleted and later additions to its ID are redirected to the target group.
+
+        Args:
+            target_group_id (int): Group that absorbs the others.
+            source_item_ids (dict[int, set[str]]): Source group ID -> system IDs of the items to move.
+            validate (Callable, optional): Called under the lock with (target group, source group, items to move);
+                the source is skipped if it returns False.
+        Returns:
+            dict[int, int]: Merged source group ID -> number of moved items.
+        """
+
+        merged = dict()
+        async with self.groups_lock:
+            target_group = self.groups.get(target_group_id)
+            if target_group is None:
+                return merged
+
+            for source_group_id, item_ids in source_item_ids.items():
+                source_group = self.groups.get(source_group_id)
+                if source_group is None or source_group_id == target_group_id:
+                    continue
+
+                items = [source_group.items[item_id] for item_id in item_ids if item_id in source_group.items]
+                if not items or (validate and not validate(target_group, source_group, items)):
+                    continue
+
+                for item in items:
+                    await source_group.remove_item(item.system_id)
+                    await target_group.add_item(item)
+                target_group.key_words |= source_group.key_words
+                merged[source_group_id] = len(items)
+
+                if not source_group.items:
+                    del self.groups[source_group_id]
+                    self.merged_groups[source_group_id] = target_group_id
+        
+        return merged
+
+    async def snapshot_groups(self, min_group_id: int | None = None, max_group_id: int | None = None) -> list[tuple[int, list[Item]]]:
+        """
+        Returns a consistent snapshot of the groups as (group_id, items) pairs ordered by group ID.
+        Only references are copied, so locks are held briefly and no serialization happens here.
+
+        Args:
+            min_group_id (int | None): Smallest group ID to include (inclusive).
+            max_group_id (int | None): Largest group ID to include (inclusive).
+        """
+
+        snapshot = list()
+        async with self.groups_lock:
+            for group_idx in sorted(self.groups.keys()):
+                if min_group_id is not None and group_idx < min_group_id:
+                    continue
+                if max_group_id is not None and group_idx > max_group_id:
+                    continue
+                group = self.groups[group_idx]
+                async with group.lock:
+                    snapshot.append((group_idx, list(group.items.values())))
+        
+        return snapshot
+
+    async def save(self, file_path: str | Path):
+        """Persist the whole state (groups, key words, caches) to a JSON file that `load` can restore. The file is replaced atomically."""
+
+        file_path = Path(file_path)
+        os.makedirs(file_path.parent, exist_ok=True)
+
+        snapshot = await self.snapshot_groups()
+        async with self.groups_lock:
+            key_words = {group_idx: sorted(group.key_words) for group_idx, group in self.groups.items()}
+        async with self.cols_hashed_lock:
+            cols_hashed = dict(self.cols_hashed)
+        async with self.content_hashes_lock:
+            content_hashes = sorted(self.content_hashes)
+
+        output = {
+            "next_group_id": self.next_group_id,
+            "merged_groups": self.merged_groups,
+            "total_processed_files": self.total_processed_files,
+            "total_items_processed": self.total_items_processed,
+            "cols_hashed": cols_hashed,
+            "content_hashes": content_hashes,
+            "groups": {
+                group_idx: {
+                    "key_words": key_words.get(group_idx, []),
+                    "items": [{"system_item_id": item.system_id, "original_item_id": item.original_id, "origin_file": item.origin_file, "description": item.original_description} for item in items]
+                }
+                for group_idx, items in snapshot
+            }
+        }
+
+        tmp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(output, f)
+        os.replace(tmp_path, file_path)
+
+    async def load(self, file_path: str | Path):
+        """Replace the current state with one persisted by `save`"""
+
+        with open(file_path) as f:
+            data = json.load(f)
+
+        term_statistics = TermStatistics() # Rebuilt as items are added back
+        groups = dict()
+        for group_idx, group_data in data["groups"].items():
+            group = Group(int(group_idx), term_statistics)
+            for item_data in group_data["items"]:
+                await group.add_item(Item.restore(item_data["system_item_id"], item_data["original_item_id"], item_data["origin_file"], item_data["description"]))
+            group.key_words = set(group_data["key_words"])
+            groups[group.group_id] = group
+
+        async with self.groups_lock:
+            self.groups = groups
+            self.term_statistics = term_statistics
+            self.next_group_id = max(data["next_group_id"], max(groups.keys(), default=-1) + 1)
+            self.merged_groups = {int(source): target for source, target in data.get("merged_groups", {}).items()}
+            self.total_processed_files = data["total_processed_files"]
+            self.total_items_processed = data["total_items_processed"]
+        async with self.cols_hashed_lock:
+            self.cols_hashed = data["cols_hashed"]
+        async with self.content_hashes_lock:
+            self.content_hashes = set(data["content_hashes"])
+
     async def dump(self, folder_path: str):
         """Dump the current state of groups into a JSON file for inspection"""
 
         os.makedirs(folder_path, exist_ok=True)
         folder_path = Path(folder_path)
 
-        output = dict()
-        async with self.groups_lock:
-            for group_idx, group in self.groups.items():
-                async with group.lock:
-                    output[group_idx] = [{"description": item.original_description, "system_item_id": item.system_id, "origin_file": item.origin_file} for item in group.items.values()]
+        snapshot = await self.snapshot_groups()
         
-        with open(folder_path / "groups.json", "w") as f:
-            json.dump(output, f, indent=4)
+        with open(folder_path / "groups.json", "w") as f: # Written group by group to avoid building the whole output in memory
+            f.write("{")
+            for i, (group_idx, items) in enumerate(snapshot):
+                group_items = [{"description": item.original_description, "system_item_id": item.system_id, "origin_file": item.origin_file} for item in items]
+                f.write(f"{',' if i else ''}\n    {json.dumps(str(group_idx))}: ")
+                f.write(json.dumps(group_items, indent=4).replace("\n", "\n    "))
+            f.write("\n}" if snapshot else "}")
 
 app_state = AppState()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test") # The client is built at import time
+
+from src import app_state
+from src.llm import LLM
+from src.llm.llm import _build_client
+from src.llm.rate_limiter import RateLimiter
+
+LLM_SETTINGS = ("api_key", "base_url", "model_name", "requests_per_minute", "tokens_per_minute", "hedge_delay", "call_budget", "call_count")
+
+def responses_api_answer(text: str, total_tokens: int = 6) -> httpx.Response:
+    """Minimal Responses API payload with the given output text."""
+
+    return httpx.Response(200, json={
+        "id": "resp", "object": "response", "created_at": 0, "model": "fake", "status": "completed",
+        "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        "output": [{
+            "type": "message", "id": "msg", "status": "completed", "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}]
+        }],
+        "usage": {
+            "input_tokens": total_tokens - 1, "output_tokens": 1, "total_tokens": total_tokens,
+            "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}
+        }
+    })
+
+@pytest.fixture(autouse=True)
+def reset_globals():
+    """Restores the LLM gateway (client, limits, hedging, budget) and empties the app state after each test."""
+
+    settings = {name: getattr(LLM, name) for name in LLM_SETTINGS}
+    client = LLM.client
+    yield
+
+    test_client = LLM.client
+    for name, value in settings.items():
+        setattr(LLM, name, value)
+    LLM.rate_limiter = RateLimiter(LLM.requests_per_minute, LLM.tokens_per_minute) # Its locks may be bound to the test's event loop
+    if test_client is not client: # `configure` closed the original client
+        LLM.client = _build_client(LLM.api_key, LLM.base_url)
+        asyncio.run(test_client.close())
+
+    app_state.__init__()
+
+@pytest.fixture
+def fake_llm():
+    """
+    Returns an async function pointing the gateway to an in-process fake server. The server answers with
+    `await handler(call_number, request)`: an httpx.Response, or a string sent as the model's output text.
+    The function returns the list of received request payloads.
+    """
+
+    async def configure(handler, hedge_delay: float | None = None) -> list[dict]:
+        calls = list()
+
+        async def transport_handler(request: httpx.Request) -> httpx.Response:
+            calls.append(json.loads(request.content))
+            response = await handler(len(calls), request)
+            return response if isinstance(response, httpx.Response) else responses_api_answer(response)
+
+        await LLM.configure(base_url="http://fake-llm/v1", hedge_delay=hedge_delay, transport=httpx.MockTransport(transport_handler))
+        LLM.set_budget(None)
+        return calls
+
+    return configure
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from src import app_state
+from src.backfill import backfill
+from src.domain import Item
+from src.llm import LLM, LLMBudgetExceededError
+from src.service import GroupingService, GroupConsolidationService
+
+def test_budget_exhaustion_is_raised_and_batch_can_be_rolled_back():
+    async def run():
+        seeded = [Item([description], "a.csv", str(idx)) for idx, description in enumerate(["caneta bic azul", "papel a4 chamex"])]
+        await GroupingService.group_items(seeded)
+        groups_before = {group_id: set(group.items) for group_id, group in app_state.groups.items()}
+
+        # The second item is similar to no group: the LLM would be asked, but the budget is already exhausted
+        batch = [Item(["caneta bic azul"], "b.csv", "1"), Item(["grampeador metalico grande"], "b.csv", "2")] # First one is grouped locally
+        first_new_group_id = app_state.next_group_id
+        LLM.set_budget(0)
+        with pytest.raises(LLMBudgetExceededError):
+            await GroupingService.group_items(batch)
+
+        await app_state.ungroup_items(batch, first_new_group_id)
+        groups_after = {group_id: set(group.items) for group_id, group in app_state.groups.items()}
+        return groups_before, groups_after, batch
+
+    groups_before, groups_after, batch = asyncio.run(run())
+    assert groups_after == groups_before
+    assert all(item.group_id is None for item in batch)
+
+CATALOG_A = "codigo,produto\n1,caneta esferografica bic azul\n2,papel sulfite a4 chamex\n3,grampeador metalico grande\n"
+CATALOG_B = "codigo,produto\n1,caneta esferografica bic azul\n2,calculadora cientifica casio\n"
+
+def fake_catalog_llm(fake_llm):
+    """Fake server answering the useful columns prompt, and "no equivalent item" to every grouping prompt."""
+
+    async def handler(n, request):
+        return "codigo, produto" if "Colunas disponíveis" in json.loads(request.content)["input"] else "-1"
+
+    return fake_llm(handler)
+
+def groups_by_description() -> dict[int, list[str]]:
+    return {group_id: sorted(item.original_description for item in group.items.values()) for group_id, group in app_state.groups.items()}
+
+@pytest.fixture
+def catalogs(tmp_path):
+    directory = tmp_path / "catalogs"
+    (directory / "copies").mkdir(parents=True)
+    (directory / "a.csv").write_text(CATALOG_A)
+    (directory / "b.csv").write_text(CATALOG_B)
+    (directory / "copies" / "a.csv").write_text(CATALOG_A) # Same content as a.csv
+    return directory
+
+def test_backfill_checkpoints_resumes_and_round_trips(catalogs, tmp_path, fake_llm, monkeypatch):
+    state_path = tmp_path / "state.json"
+    checkpoints = list()
+    save = app_state.save
+
+    async def recording_save(file_path):
+        checkpoints.append(len(app_state.content_hashes))
+        await save(file_path)
+
+    monkeypatch.setattr(app_state, "save", recording_save)
+
+    async def run():
+        await fake_catalog_llm(fake_llm)
+        await backfill(catalogs, state_path, workers=1, checkpoint_every=1)
+        return groups_by_description(), app_state.total_items_processed
+
+    groups, total_items = asyncio.run(run())
+    assert checkpoints == [1, 2, 2] # One per file, then the final save
+    assert total_items == 5 # The copy of a.csv is not ingested again
+    assert len(app_state.content_hashes) == 2
+
+    app_state.__init__()
+    asyncio.run(app_state.load(state_path))
+    assert groups_by_description() == groups
+    assert app_state.total_items_processed == total_items
+
+    async def resume():
+        calls = await fake_catalog_llm(fake_llm)
+        await backfill(catalogs, state_path, workers=1)
+        return calls
+
+    assert asyncio.run(resume()) == [] # Every file is already in the state
+    assert groups_by_description() == groups
+
+def test_backfill_budget_stop_leaves_file_unmarked(catalogs, tmp_path, fake_llm, monkeypatch):
+    state_path = tmp_path / "state.json"
+    consolidation_budgets = list()
+    consolidate = GroupConsolidationService.consolidate
+
+    async def recording_consolidate(llm_budget):
+        consolidation_budgets.append(llm_budget)
+        return await consolidate(llm_budget=llm_budget)
+
+    monkeypatch.setattr(GroupConsolidationService, "consolidate", staticmethod(recording_consolidate))
+
+    # One call for the columns of a.csv (cached for b.csv). The first item of b.csv is grouped locally, the second needs the LLM
+    async def run():
+        await fake_catalog_llm(fake_llm)
+        await backfill(catalogs, state_path, llm_budget=1, workers=1, consolidate=True)
+
+    asyncio.run(run())
+    app_state.__init__()
+    asyncio.run(app_state.load(state_path))
+    assert consolidation_budgets == [0] # Still runs, without LLM calls
+    assert app_state.content_hashes == {app_state.hash_content(CATALOG_A.encode())}
+    assert sorted(description for descriptions in groups_by_description().values() for description in descriptions) == [
+        "caneta esferografica bic azul", "grampeador metalico grande", "papel sulfite a4 chamex"
+    ]
+
+    async def resume():
+        await fake_catalog_llm(fake_llm)
+        await backfill(catalogs, state_path, workers=1)
+
+    asyncio.run(resume())
+    assert len(app_state.content_hashes) == 2
+    assert app_state.total_items_processed == 5
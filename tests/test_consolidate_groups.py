@@ -0,0 +1,126 @@
+import asyncio
+
+from src.domain import Item
+from src.service import GroupConsolidationService
+from src.state import AppState
+
+def make_item(description: str, origin_file: str) -> Item:
+    return Item([description], origin_file, "1")
+
+def test_plan_merges_checks_key_words_for_whole_clusters():
+    # A requires "azul"; B has no key words; C lacks "azul". A-B and B-C are fine, but C must not end up with A.
+    snapshot = {
+        0: [make_item("caneta bic azul", "a.csv")],
+        1: [make_item("caneta bic azul", "b.csv")],
+        2: [make_item("caneta bic", "c.csv")]
+    }
+    key_words = {0: {"azul"}}
+    pairs = [(0, 1, 0.1), (1, 2, 0.2)]
+
+    merges = GroupConsolidationService._plan_merges(snapshot, key_words, pairs)
+
+    assert merges == {0: [1]}
+
+def test_plan_merges_never_joins_clusters_sharing_an_origin_file():
+    snapshot = {
+        0: [make_item("caneta bic azul", "a.csv")],
+        1: [make_item("caneta bic azul", "b.csv")],
+        2: [make_item("caneta bic azul", "a.csv")]
+    }
+    pairs = [(0, 1, 0.1), (1, 2, 0.1)]
+
+    merges = GroupConsolidationService._plan_merges(snapshot, {}, pairs)
+
+    assert merges == {0: [1]}
+
+def test_merge_groups_moves_only_planned_items():
+    async def run():
+        state = AppState()
+        planned = make_item("caneta bic azul", "b.csv")
+        target_id = await state.create_new_group(make_item("caneta bic azul", "a.csv"))
+        source_id = await state.create_new_group(planned)
+        late = make_item("caneta bic azul escrita fina", "c.csv") # Added after the merge was planned
+        await state.add_to_group(source_id, late)
+
+        merged = await state.merge_groups(target_id, {source_id: {planned.system_id}})
+        return state, merged, planned.group_id, late.group_id, target_id, source_id
+
+    state, merged, planned_group, late_group, target_id, source_id = asyncio.run(run())
+    assert merged == {source_id: 1}
+    assert planned_group == target_id
+    assert late_group == source_id
+    assert source_id in state.groups # Not deleted while it still has an item
+
+def test_merge_groups_skips_sources_rejected_by_validation():
+    async def run():
+        state = AppState()
+        target_id = await state.create_new_group(make_item("caneta bic azul", "a.csv"))
+        source_item = make_item("caneta bic azul", "b.csv")
+        source_id = await state.create_new_group(source_item)
+
+        merged = await state.merge_groups(target_id, {source_id: {source_item.system_id}}, lambda target, source, items: False)
+        return merged, source_item.group_id, source_id
+
+    merged, source_group, source_id = asyncio.run(run())
+    assert merged == {}
+    assert source_group == source_id
+
+def test_add_to_merged_group_is_redirected():
+    async def run():
+        state = AppState()
+        target_id = await state.create_new_group(make_item("caneta bic azul", "a.csv"))
+        source_item = make_item("caneta bic azul", "b.csv")
+        source_id = await state.create_new_group(source_item)
+        await state.merge_groups(target_id, {source_id: {source_item.system_id}})
+
+        late = make_item("caneta azul bic", "c.csv")
+        await state.add_to_group(source_id, late) # e.g. decided from scores computed before the merge
+        return state, late.group_id, target_id, source_id
+
+    state, late_group, target_id, source_id = asyncio.run(run())
+    assert source_id not in state.groups
+    assert late_group == target_id
+
+def test_resolve_ambiguous_pairs_counts_every_llm_call(fake_llm):
+    async def handler(n, request):
+        return "invalid" # Every pair is re-asked until the budget runs out
+
+    snapshot = {idx: [make_item(f"caneta bic {idx}", f"{idx}.csv")] for idx in range(10)}
+    pairs = [(idx, idx + 1, 0.4) for idx in range(0, 10, 2)]
+
+    async def run():
+        calls = await fake_llm(handler)
+        accepted, llm_calls = await GroupConsolidationService._resolve_ambiguous_pairs(snapshot, pairs, llm_budget=3)
+        return accepted, llm_calls, len(calls)
+
+    accepted, llm_calls, server_calls = asyncio.run(run())
+    assert accepted == []
+    assert llm_calls == server_calls == 3
+
+def test_consolidate_holds_grouping_lock_only_while_merging(monkeypatch):
+    from src import app_state
+
+    lock_held_while_resolving = list()
+    lock_held_while_merging = list()
+    original_merge_groups = app_state.merge_groups
+
+    async def resolve_ambiguous_pairs(snapshot, pairs, llm_budget):
+        lock_held_while_resolving.append(app_state.grouping_lock.locked())
+        return [], 0
+
+    async def merge_groups(target_group_id, source_item_ids, validate=None):
+        lock_held_while_merging.append(app_state.grouping_lock.locked())
+        return await original_merge_groups(target_group_id, source_item_ids, validate)
+
+    monkeypatch.setattr(GroupConsolidationService, "_resolve_ambiguous_pairs", staticmethod(resolve_ambiguous_pairs))
+    monkeypatch.setattr(app_state, "merge_groups", merge_groups)
+
+    async def run():
+        await app_state.create_new_group(make_item("caneta esferografica bic cristal azul", "a.csv"))
+        await app_state.create_new_group(make_item("caneta esferografica bic cristal azul", "b.csv"))
+        return await GroupConsolidationService.consolidate(llm_budget=10)
+
+    report = asyncio.run(run())
+    assert lock_held_while_resolving == [False]
+    assert lock_held_while_merging == [True]
+    assert [entry["merged_group_ids"] for entry in report] == [[1]]
@@ -0,0 +1,96 @@
+import asyncio
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import app_state
+from src.domain import Item
+from src.service import ExportGroupsService
+
+def populate(groups: list[list[tuple[str, str]]]):
+    """Creates one group per entry, each with the given (description, origin file) items."""
+
+    async def run():
+        for descriptions in groups:
+            group_id = app_state.next_group_id
+            for idx, (description, origin_file) in enumerate(descriptions):
+                await app_state.add_to_group(group_id, Item([description], origin_file, str(idx)))
+
+    asyncio.run(run())
+
+def export(export_format: str, **filters) -> bytes:
+    snapshot = asyncio.run(ExportGroupsService.snapshot(**filters))
+    return b"".join(ExportGroupsService.iter_export(snapshot, export_format))
+
+def read_ndjson(data: bytes) -> list[dict]:
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+@pytest.fixture
+def groups():
+    populate([
+        [("caneta bic azul", "a.csv"), ("caneta azul bic", "b.csv")],
+        [("papel a4 chamex", "a.csv")],
+        [("grampeador metalico", "b.csv"), ("grampeador de metal", "c.csv")]
+    ])
+
+def test_ndjson_has_one_row_per_item(groups):
+    rows = read_ndjson(export("ndjson"))
+
+    assert [(row["group_id"], row["description"], row["origin_file"]) for row in rows] == [
+        (0, "caneta bic azul", "a.csv"), (0, "caneta azul bic", "b.csv"),
+        (1, "papel a4 chamex", "a.csv"),
+        (2, "grampeador metalico", "b.csv"), (2, "grampeador de metal", "c.csv")
+    ]
+    assert set(rows[0]) == {"group_id", "system_item_id", "original_item_id", "description", "origin_file"}
+
+def test_parquet_round_trip_with_several_row_groups(groups):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    snapshot = asyncio.run(ExportGroupsService.snapshot())
+    chunks = list(ExportGroupsService.iter_parquet(snapshot, batch_size=2))
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+    assert len(chunks) > 1 # Streamed, not built at once
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.read().to_pylist() == list(ExportGroupsService.iter_rows(snapshot))
+
+def test_group_id_range_filter(groups):
+    rows = read_ndjson(export("ndjson", min_group_id=1, max_group_id=2))
+    assert {row["group_id"] for row in rows} == {1, 2}
+
+    rows = read_ndjson(export("ndjson", max_group_id=0))
+    assert {row["group_id"] for row in rows} == {0}
+
+def test_origin_file_filter_drops_groups_left_empty(groups):
+    rows = read_ndjson(export("ndjson", origin_file="b.csv"))
+
+    assert [(row["group_id"], row["description"]) for row in rows] == [(0, "caneta azul bic"), (2, "grampeador metalico")]
+
+def test_empty_snapshot():
+    assert export("ndjson") == b""
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(export("parquet")))
+    assert table.num_rows == 0
+    assert table.column_names == ["group_id", "system_item_id", "original_item_id", "description", "origin_file"]
+
+def test_unsupported_format_is_rejected():
+    with pytest.raises(ValueError):
+        ExportGroupsService.iter_export([], "csv")
+
+def test_export_endpoint(groups, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path) # The API module creates its upload folder on import
+    from src import main
+
+    client = TestClient(main.app)
+
+    response = client.get("/export/", params={"format": "ndjson", "origin_file": "a.csv"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [row["description"] for row in read_ndjson(response.content)] == ["caneta bic azul", "papel a4 chamex"]
+
+    assert "Unsupported export format" in client.get("/export/", params={"format": "csv"}).json()["info"]
+
+    monkeypatch.setattr(main, "find_spec", lambda name: None)
+    assert "requires 'pyarrow'" in client.get("/export/", params={"format": "parquet"}).json()["info"]
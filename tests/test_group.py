@@ -0,0 +1,150 @@
+import asyncio
+from collections import Counter
+
+from src.domain import Item, Group, TermStatistics
+from src.service.group_items import GroupingService
+from src.state import AppState
+
+def make_item(description: str, origin_file: str = "a.csv") -> Item:
+    return Item([description], origin_file, "1")
+
+def stems(description: str) -> set[str]:
+    return {Item.stemmer.stem(word) for word in description.split()}
+
+def assert_statistics_consistent(state: AppState):
+    """The incremental statistics must equal the ones computed from scratch."""
+
+    document_frequencies = Counter()
+    for group in state.groups.values():
+        assert group.corpus is state.term_statistics
+        assert group.term_counts == Counter(term for item in group.items.values() for term in item.words_set)
+        document_frequencies.update(group.term_counts.keys())
+
+    assert state.term_statistics.documents == sum(1 for group in state.groups.values() if group.items)
+    assert state.term_statistics.document_frequencies == document_frequencies
+
+def test_add_and_remove_update_statistics():
+    async def run():
+        state = AppState()
+        item = make_item("caneta bic azul")
+        group_id = await state.create_new_group(item)
+        await state.add_to_group(group_id, make_item("caneta bic preta"))
+        assert_statistics_consistent(state)
+        assert state.term_statistics.documents == 1
+
+        await state.groups[group_id].remove_item(item.system_id)
+        assert_statistics_consistent(state)
+        assert Item.stemmer.stem("azul") not in state.term_statistics.document_frequencies
+
+        await state.groups[group_id].remove_item(next(iter(state.groups[group_id].items)))
+        assert state.term_statistics.documents == 0
+        assert not state.term_statistics.document_frequencies
+
+    asyncio.run(run())
+
+def test_adding_an_item_twice_counts_it_once():
+    async def run():
+        state = AppState()
+        item = make_item("caneta bic azul")
+        group_id = await state.create_new_group(item)
+        await state.groups[group_id].add_item(item)
+        return state, group_id
+
+    state, group_id = asyncio.run(run())
+    assert_statistics_consistent(state)
+    assert set(state.groups[group_id].term_counts.values()) == {1}
+
+def test_merge_and_ungroup_keep_statistics_consistent():
+    async def run():
+        state = AppState()
+        target_id = await state.create_new_group(make_item("caneta bic azul", "a.csv"))
+        source_item = make_item("caneta bic cristal", "b.csv")
+        source_id = await state.create_new_group(source_item)
+
+        await state.merge_groups(target_id, {source_id: {source_item.system_id}})
+        assert_statistics_consistent(state)
+        assert state.term_statistics.documents == 1
+
+        first_new_group_id = state.next_group_id
+        batch = [make_item("caneta bic azul", "c.csv"), make_item("grampeador metalico", "c.csv")]
+        await state.add_to_group(target_id, batch[0])
+        await state.create_new_group(batch[1])
+        await state.ungroup_items(batch, first_new_group_id)
+        assert_statistics_consistent(state)
+        assert state.term_statistics.documents == 1
+
+    asyncio.run(run())
+
+def test_load_rebuilds_statistics(tmp_path):
+    async def run():
+        state = AppState()
+        await state.create_new_group(make_item("caneta bic azul"))
+        await state.create_new_group(make_item("papel a4 chamex"))
+        await state.save(tmp_path / "state.json")
+
+        loaded = AppState()
+        await loaded.create_new_group(make_item("grampeador metalico")) # Replaced by the load
+        await loaded.load(tmp_path / "state.json")
+        return state, loaded
+
+    state, loaded = asyncio.run(run())
+    assert_statistics_consistent(loaded)
+    assert loaded.term_statistics is not state.term_statistics
+    assert loaded.term_statistics.document_frequencies == state.term_statistics.document_frequencies
+
+def test_states_do_not_share_statistics():
+    async def run():
+        first, second = AppState(), AppState()
+        await first.create_new_group(make_item("caneta bic azul"))
+        return second
+
+    assert asyncio.run(run()).term_statistics.documents == 0
+
+def test_inferred_key_words_are_refreshed_lazily(monkeypatch):
+    computations = list()
+    compute = Group._compute_inferred_key_words
+
+    def counting_compute(self):
+        computations.append(self.group_id)
+        return compute(self)
+
+    monkeypatch.setattr(Group, "_compute_inferred_key_words", counting_compute)
+
+    async def run():
+        state = AppState()
+        group_id = await state.create_new_group(make_item("caneta bic azul"))
+        group = state.groups[group_id]
+
+        group.inferred_key_words()
+        group.inferred_key_words() # Cached
+        assert len(computations) == 1
+
+        await state.create_new_group(make_item("papel a4 chamex")) # Corpus doubled: drift
+        group.inferred_key_words()
+        assert len(computations) == 2
+
+        await group.add_item(make_item("caneta bic azul", "b.csv")) # Group changed
+        group.inferred_key_words()
+        group.inferred_key_words()
+        assert len(computations) == 3
+
+    asyncio.run(run())
+
+def test_inferred_key_words_ties_favor_leading_words():
+    corpus = TermStatistics()
+    group = Group(0, corpus)
+    asyncio.run(group.add_item(make_item("caneta esferografica bic cristal azul")))
+
+    assert group.inferred_key_words() == stems("caneta esferografica bic")
+
+def test_group_without_inferred_key_words_never_wins_tie_break():
+    async def run():
+        state = AppState()
+        mixed_id = await state.create_new_group(make_item("caneta azul"))
+        for description in ["lapis preto", "borracha branca", "regua plastica", "cola bastao"]:
+            await state.add_to_group(mixed_id, make_item(description))
+        return state.groups[mixed_id]
+
+    mixed_group = asyncio.run(run())
+    assert mixed_group.inferred_key_words() == set()
+    assert not GroupingService._matches_inferred_key_words(make_item("caneta bic cristal azul"), mixed_group)
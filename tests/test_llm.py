@@ -0,0 +1,182 @@
+import asyncio
+from time import monotonic
+
+import httpx
+import pytest
+
+from src.llm import LLM
+from src.llm.rate_limiter import TokenBucket, RateLimiter
+
+def test_retry_honors_retry_after(fake_llm):
+    async def handler(n, request):
+        if n == 1:
+            return httpx.Response(429, json={"error": {"message": "rate limited"}}, headers={"retry-after": "0.3"})
+        return "ok"
+
+    async def run():
+        calls = await fake_llm(handler)
+        start = monotonic()
+        answer = await LLM.execute("prompt")
+        return answer, len(calls), monotonic() - start
+
+    answer, n_calls, elapsed = asyncio.run(run())
+    assert answer == "ok"
+    assert n_calls == 2
+    assert elapsed >= 0.3
+
+def test_hedge_wins_when_primary_is_slow(fake_llm):
+    async def handler(n, request):
+        if n == 1:
+            await asyncio.sleep(5)
+            return "primary"
+        return "hedge"
+
+    async def run():
+        calls = await fake_llm(handler, hedge_delay=0.05)
+        start = monotonic()
+        answer = await LLM.execute("prompt")
+        return answer, len(calls), monotonic() - start
+
+    answer, n_calls, elapsed = asyncio.run(run())
+    assert answer == "hedge"
+    assert n_calls == 2
+    assert elapsed < 1
+
+def test_hedge_loses_when_primary_finishes_first(fake_llm):
+    async def handler(n, request):
+        if n == 1:
+            await asyncio.sleep(0.1)
+            return "primary"
+        await asyncio.sleep(5)
+        return "hedge"
+
+    async def run():
+        calls = await fake_llm(handler, hedge_delay=0.05)
+        return await LLM.execute("prompt"), len(calls)
+
+    assert asyncio.run(run()) == ("primary", 2)
+
+def test_no_hedge_when_primary_is_fast(fake_llm):
+    async def handler(n, request):
+        return "primary"
+
+    async def run():
+        calls = await fake_llm(handler, hedge_delay=0.5)
+        return await LLM.execute("prompt"), len(calls)
+
+    assert asyncio.run(run()) == ("primary", 1)
+
+def test_deadline_expires_and_cancels_requests(fake_llm):
+    cancelled = list()
+
+    async def handler(n, request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return "late"
+
+    async def run():
+        await fake_llm(handler, hedge_delay=0.05)
+        with pytest.raises(TimeoutError):
+            await LLM.execute("prompt", deadline=0.2)
+        await asyncio.sleep(0) # Let cancellations propagate
+
+    asyncio.run(run())
+    assert sorted(cancelled) == [1, 2]
+
+def test_execute_choice_validates_answer(fake_llm):
+    answers = iter(["3", "abc"])
+
+    async def handler(n, request):
+        return next(answers, "-1")
+
+    async def run():
+        await fake_llm(handler)
+        return await LLM.execute_choice("prompt", [3, -1])
+
+    assert asyncio.run(run()) == 3
+
+def test_execute_choice_returns_none_on_invalid_answers(fake_llm):
+    async def handler(n, request):
+        return "7" # Not a possible value
+
+    async def run():
+        calls = await fake_llm(handler)
+        return await LLM.execute_choice("prompt", [3, -1]), len(calls)
+
+    answer, n_calls = asyncio.run(run())
+    assert answer is None
+    assert n_calls > 1 # Asked again before giving up
+
+def test_token_bucket_reconciliation():
+    async def run():
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+        await limiter.acquire(100)
+        after_acquire = limiter.tokens.tokens
+
+        limiter.reconcile(estimated_tokens=100, used_tokens=300) # Used more than estimated: debt
+        after_debt = limiter.tokens.tokens
+
+        limiter.reconcile(estimated_tokens=300, used_tokens=0) # Used less: refund, capped at capacity
+        limiter.reconcile(estimated_tokens=10_000, used_tokens=0)
+        after_refund = limiter.tokens.tokens
+
+        limiter.reconcile(estimated_tokens=100, used_tokens=None) # Unknown usage keeps the estimate
+        return after_acquire, after_debt, after_refund, limiter.tokens.tokens
+
+    after_acquire, after_debt, after_refund, after_unknown = asyncio.run(run())
+    assert after_acquire == pytest.approx(500, abs=1)
+    assert after_debt == pytest.approx(300, abs=1)
+    assert after_refund == 600
+    assert after_unknown == 600
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(capacity=10, refill_rate=100) # 10 tokens, refilled in 0.1 s
+        await bucket.acquire(10)
+        start = monotonic()
+        await bucket.acquire(5)
+        return monotonic() - start
+
+    assert asyncio.run(run()) >= 0.04
+
+def test_deadline_before_hedge_cancels_primary(fake_llm):
+    cancelled = list()
+
+    async def handler(n, request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return "late"
+
+    async def run():
+        calls = await fake_llm(handler, hedge_delay=1.0)
+        with pytest.raises(TimeoutError):
+            await LLM.execute("prompt", deadline=0.1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    assert asyncio.run(run()) == 1
+    assert cancelled == [1]
+
+def test_configure_can_disable_hedging(fake_llm):
+    async def run():
+        await fake_llm(lambda n, request: None, hedge_delay=0.5)
+        await LLM.configure()
+        kept = LLM.hedge_delay
+        await LLM.configure(hedge_delay=None)
+        return kept, LLM.hedge_delay
+
+    assert asyncio.run(run()) == (0.5, None)
+
+def test_configure_keeps_custom_limits(fake_llm):
+    async def run():
+        await LLM.configure(requests_per_minute=5, tokens_per_minute=500)
+        await fake_llm(lambda n, request: None)
+        return LLM.rate_limiter.requests.capacity, LLM.rate_limiter.tokens.capacity
+
+    assert asyncio.run(run()) == (5, 500)